@@ -1,18 +1,25 @@
+import math
 import time
 import cv2
 import numpy as np
 
-from starlette.responses import StreamingResponse, Response
+from starlette.responses import StreamingResponse, Response, JSONResponse, PlainTextResponse
 from fastapi import APIRouter
+from fastapi.params import Query
 
 from core import get_stream_controller
 from core.shared_buffer import SharedRingBuffer
-from utils import get_logger
+from api.response import create_err_response, create_ok_response
+from utils import get_logger, get_profiler
 
 logger = get_logger(__name__)
+profiler = get_profiler()
 
 debug = APIRouter(prefix="/debug")
 
+# 拼接流最多的格子数，配合格子尺寸上限约束画布大小
+MAX_MOSAIC_TILES = 64
+
 
 def generate_frames(core_id: str | None):
     stream_controller = get_stream_controller()
@@ -58,11 +65,24 @@ def generate_frames(core_id: str | None):
         )
 
         # 编码并输出图像
-        _, data = cv2.imencode('.jpg', image)
+        with profiler.span("encode", core_id, frame.seq):
+            _, data = cv2.imencode('.jpg', image)
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n\r\n' + data.tobytes() + b'\r\n')
 
 
+def generate_mosaic_frames(core_ids: list[str], rows: int, cols: int, tile_width: int, tile_height: int):
+    # 在生成器内部登记观看者，保证连接断开时一定能注销
+    stream_controller = get_stream_controller()
+    mosaic = stream_controller.acquire_mosaic(core_ids, rows, cols, tile_width, tile_height)
+    try:
+        for data in mosaic.frames():
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + data + b'\r\n')
+    finally:
+        stream_controller.release_mosaic(mosaic)
+
+
 @debug.get('/video_stream')
 async def video_stream():
     return StreamingResponse(generate_frames(None), media_type='multipart/x-mixed-replace; boundary=frame')
@@ -71,3 +91,107 @@ async def video_stream():
 @debug.get('/video_stream/{core_id}')
 async def video_stream(core_id: str):
     return StreamingResponse(generate_frames(core_id), media_type='multipart/x-mixed-replace; boundary=frame')
+
+
+@debug.get('/mosaic')
+async def mosaic_stream(
+        core_ids: str = Query(..., description="逗号分隔的core_id，按行优先填入网格"),
+        layout: str | None = Query(default=None, description="网格布局，如 2x3（行x列），默认自动取接近正方形"),
+        tile_width: int = Query(default=320, gt=0, le=1920),
+        tile_height: int = Query(default=180, gt=0, le=1080)
+):
+    ids = [core_id for core_id in core_ids.split(",") if core_id]
+    if not ids:
+        return create_err_response("core_ids不能为空")
+
+    buffers = get_stream_controller().display_memory_manager.get_all_buffers()
+    missing = [core_id for core_id in ids if core_id not in buffers]
+    if missing:
+        return create_err_response(f"未找到Core: {','.join(missing)}")
+
+    if layout is None:
+        cols = math.ceil(math.sqrt(len(ids)))
+        rows = math.ceil(len(ids) / cols)
+    else:
+        try:
+            rows, cols = (int(n) for n in layout.lower().split("x"))
+        except ValueError:
+            return create_err_response(f"布局格式错误: {layout}")
+        if rows <= 0 or cols <= 0 or rows * cols < len(ids):
+            return create_err_response(f"布局 {layout} 无法容纳 {len(ids)} 路画面")
+    if rows * cols > MAX_MOSAIC_TILES:
+        return create_err_response(f"格子数不能超过 {MAX_MOSAIC_TILES}")
+
+    return StreamingResponse(
+            generate_mosaic_frames(ids, rows, cols, tile_width, tile_height),
+            media_type='multipart/x-mixed-replace; boundary=frame'
+    )
+
+
+@debug.get('/frame/{core_id}')
+async def frame_at(
+        core_id: str,
+        timestamp: int = Query(..., description="目标时间戳（毫秒）"),
+        tolerance: int | None = Query(default=None, ge=0, description="允许的最大误差（毫秒）")
+):
+    buffer = get_stream_controller().frame_memory_manager.get_buffer(core_id)
+    if buffer is None:
+        return create_err_response("未找到该Core")
+
+    frame = buffer.read_frame_at(timestamp, tolerance)
+    if frame is None:
+        return create_err_response("没有符合时间要求的帧")
+
+    image = np.frombuffer(frame.frame_bytes, np.uint8).reshape((frame.video_height, frame.video_width, 3))
+    _, data = cv2.imencode('.jpg', image)
+    return Response(content=data.tobytes(), media_type='image/jpeg', headers={"X-Frame-Timestamp": str(frame.timestamp)})
+
+
+@debug.get('/aligned_frames')
+async def aligned_frames(
+        core_ids: str = Query(..., description="逗号分隔的core_id"),
+        timestamp: int | None = Query(default=None, description="目标时间戳（毫秒），默认取所有core都已到达的最新时刻"),
+        tolerance: int = Query(default=40, ge=0, description="允许的最大误差（毫秒）")
+):
+    ids = [core_id for core_id in core_ids.split(",") if core_id]
+    frames = get_stream_controller().frame_memory_manager.read_aligned_frames(ids, timestamp, tolerance)
+    if frames is None:
+        return create_err_response("无法在误差范围内对齐")
+    return create_ok_response({core_id: frame.timestamp for core_id, frame in frames.items()})
+
+
+@debug.post('/profile/start')
+async def profile_start(
+        interval_ms: float = Query(default=10, ge=1, description="栈采样间隔（毫秒），过小会占用GIL拖慢解码线程")
+):
+    if profiler.start(interval_ms / 1000):
+        return create_ok_response(profiler.get_status())
+    return create_err_response("分析器已在运行")
+
+
+@debug.post('/profile/stop')
+async def profile_stop():
+    if profiler.stop():
+        return create_ok_response(profiler.get_status())
+    return create_err_response("分析器未运行")
+
+
+@debug.get('/profile/status')
+async def profile_status():
+    return create_ok_response(profiler.get_status())
+
+
+@debug.get('/profile/flamegraph')
+async def profile_flamegraph():
+    return PlainTextResponse(
+            profiler.export_collapsed(),
+            headers={"Content-Disposition": "attachment; filename=profile.folded"}
+    )
+
+
+@debug.get('/profile/trace')
+async def profile_trace():
+    return JSONResponse(
+            profiler.export_chrome_trace(),
+            headers={"Content-Disposition": "attachment; filename=trace.json"}
+    )
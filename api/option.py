@@ -64,6 +64,38 @@ async def delete_core(
         return create_ok_response(None)
     return create_err_response("删除失败")
 
+
+@option.post("/set_roi/{core_id}")
+async def set_roi(
+        core_id: str = Path(...),
+        regions: list[dict] = Body(..., embed=True),
+        stream_controller: StreamController = Depends(get_stream_controller)
+):
+    try:
+        if stream_controller.set_core_roi(core_id, regions):
+            return create_ok_response(stream_controller.get_core_roi(core_id))
+    except (ValueError, KeyError, TypeError, OverflowError) as e:
+        return create_err_response(f"区域配置错误: {e}")
+    return create_err_response("设置区域失败")
+
+
+@option.get("/roi/{core_id}")
+async def get_roi(
+        core_id: str = Path(...),
+        stream_controller: StreamController = Depends(get_stream_controller)
+):
+    return create_ok_response(stream_controller.get_core_roi(core_id))
+
+
+@option.delete("/clear_roi/{core_id}")
+async def clear_roi(
+        core_id: str = Path(...),
+        stream_controller: StreamController = Depends(get_stream_controller)
+):
+    if stream_controller.set_core_roi(core_id, None):
+        return create_ok_response(None)
+    return create_err_response("清除区域失败")
+
 # @option.post("/enable_ai/{core_id}")
 # async def enable_ai(
 #         core_id: str = Path(...),
@@ -31,3 +31,11 @@ async def all_status(
 ):
     cores_status = stream_controller.get_all_cores_status()
     return create_ok_response(cores_status)
+
+
+@router.get("/governor")
+async def governor_transitions(
+        stream_controller: StreamController = Depends(get_stream_controller)
+):
+    transitions = stream_controller.get_governor_transitions()
+    return create_ok_response(transitions)
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from core.processor import Processor
+from core.shared_buffer import SharedMemoryManager
+from core.stream_core import StreamCore
+from utils import get_logger, get_config
+
+logger = get_logger(__name__)
+config = get_config()
+
+
+@dataclass
+class GovernorTransition:
+    timestamp: int
+    core_id: str
+    from_level: int
+    to_level: int
+    stages: list[str]
+    reason: str
+
+
+class Governor:
+    def __init__(
+            self,
+            cores: dict[str, StreamCore],
+            frame_memory_manager: SharedMemoryManager,
+            processor: Processor,
+            history_size: int = 100
+    ):
+        '''
+        降级调节器，周期性检查解码延迟、缓冲区覆盖和处理器超时，
+        压力过大时按阶梯逐级降级core，压力消失一段时间后逐级恢复。
+        :param cores: 控制器持有的core字典
+        :param frame_memory_manager: 拉流原始数据，用于统计覆盖
+        :param processor: 处理器，用于统计超时以及暂停分析
+        :param history_size: 保留的降级记录条数
+        '''
+        self._cores = cores
+        self._frame_memory_manager = frame_memory_manager
+        self._processor = processor
+
+        self.ladder = config.governor_ladder
+        self._interval = config.governor_interval
+
+        # 每个core的当前级别、连续平稳周期数、降级后剩余冷却周期数、上次的覆盖计数
+        self._levels: dict[str, int] = {}
+        self._calm_intervals: dict[str, int] = {}
+        self._cooldowns: dict[str, int] = {}
+        self._last_overwrites: dict[str, int] = {}
+        self._last_ticks = 0
+        self._last_misses = 0
+        # 处理器超时是全局指标，每次只降级一个core，之后同样冷却
+        self._miss_cooldown = 0
+
+        self.transitions: deque[GovernorTransition] = deque(maxlen=history_size)
+
+        # 执行线程
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _get_miss_ratio(self) -> float:
+        ticks = self._processor.tick_count - self._last_ticks
+        misses = self._processor.deadline_miss_count - self._last_misses
+        self._last_ticks += ticks
+        self._last_misses += misses
+        return misses / ticks if ticks > 0 else 0
+
+    def _get_pressure(self, core_id: str, core: StreamCore, miss_ratio: float) -> tuple[str | None, bool]:
+        '''
+        只判断core自身的指标（解码延迟、覆盖）是否超过阈值，处理器超时在 _check 中统一处理
+        :return: (超过阈值的原因, 是否已低于恢复阈值)
+        '''
+        overwrites = 0
+        if buffer := self._frame_memory_manager.get_buffer(core_id):
+            count = buffer.get_overwrite_count()
+            overwrites = count - self._last_overwrites.get(core_id, count)
+            self._last_overwrites[core_id] = count
+        if "pause" in core.degrade_stages:
+            # 暂停分析时没有读取方，覆盖是预期行为
+            overwrites = 0
+
+        if core.decode_lag > config.governor_max_decode_lag:
+            return f"decode_lag={core.decode_lag}ms", False
+        if overwrites > config.governor_max_overwrites:
+            return f"overwrites={overwrites}", False
+
+        # 恢复阈值取降级阈值的一半，避免在阈值附近来回切换
+        calm = (core.decode_lag <= config.governor_max_decode_lag / 2
+                and overwrites <= config.governor_max_overwrites / 2
+                and miss_ratio <= config.governor_max_miss_ratio / 2)
+        return None, calm
+
+    def _set_level(self, core_id: str, core: StreamCore, level: int, reason: str):
+        from_level = self._levels.get(core_id, 0)
+        stages = self.ladder[:level]
+        core.set_degrade_stages(stages)
+        self._processor.set_paused(core_id, "pause" in stages)
+        self._levels[core_id] = level
+        self._calm_intervals[core_id] = 0
+        if level > from_level:
+            # 降级后等指标反映出效果再决定是否继续降级
+            self._cooldowns[core_id] = config.governor_cooldown_intervals
+
+        self.transitions.append(GovernorTransition(
+                timestamp=int(time.time() * 1000),
+                core_id=core_id,
+                from_level=from_level,
+                to_level=level,
+                stages=stages,
+                reason=reason
+        ))
+        logger.warning(f"核心 {core_id} 降级级别 {from_level} -> {level} {stages}: {reason}")
+
+    def _check(self):
+        miss_ratio = self._get_miss_ratio()
+        overloaded = miss_ratio > config.governor_max_miss_ratio
+        if self._miss_cooldown > 0:
+            self._miss_cooldown -= 1
+
+        # 可以因处理器超时被降级的core
+        candidates: list[tuple[str, StreamCore]] = []
+        for core_id, core in list(self._cores.items()):
+            level = self._levels.get(core_id, 0)
+            reason, calm = self._get_pressure(core_id, core, miss_ratio)
+            cooldown = self._cooldowns.get(core_id, 0)
+            if cooldown > 0:
+                self._cooldowns[core_id] = cooldown - 1
+
+            if reason is not None:
+                self._calm_intervals[core_id] = 0
+                if level < len(self.ladder) and cooldown == 0:
+                    self._set_level(core_id, core, level + 1, reason)
+            elif overloaded:
+                self._calm_intervals[core_id] = 0
+                if level < len(self.ladder) and cooldown == 0:
+                    candidates.append((core_id, core))
+            elif calm and level > 0:
+                self._calm_intervals[core_id] = self._calm_intervals.get(core_id, 0) + 1
+                if self._calm_intervals[core_id] >= config.governor_recover_intervals:
+                    self._set_level(core_id, core, level - 1, "recovered")
+            else:
+                self._calm_intervals[core_id] = 0
+
+        # 处理器超时只降级一个core：优先级别最低的，同级别取帧面积最大的
+        if overloaded and candidates and self._miss_cooldown == 0:
+            core_id, core = min(
+                    candidates,
+                    key=lambda item: (self._levels.get(item[0], 0), -item[1].video_width * item[1].video_height)
+            )
+            self._set_level(core_id, core, self._levels.get(core_id, 0) + 1, f"miss_ratio={miss_ratio:.2f}")
+            self._miss_cooldown = config.governor_cooldown_intervals
+
+        # 清理已删除的core
+        for core_id in list(self._last_overwrites):
+            if core_id not in self._cores:
+                self._levels.pop(core_id, None)
+                self._calm_intervals.pop(core_id, None)
+                self._cooldowns.pop(core_id, None)
+                self._last_overwrites.pop(core_id, None)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self._check()
+            except Exception as e:
+                logger.error(f"降级调节器错误: {e}")
+
+    def get_level(self, core_id: str) -> int:
+        return self._levels.get(core_id, 0)
+
+    def get_transitions(self) -> list[GovernorTransition]:
+        return list(self.transitions)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
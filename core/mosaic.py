@@ -0,0 +1,152 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from core.shared_buffer import SharedMemoryManager
+from utils import get_logger, get_profiler
+
+logger = get_logger(__name__)
+profiler = get_profiler()
+
+
+class MosaicStream:
+    def __init__(
+            self,
+            memory_manager: SharedMemoryManager,
+            core_ids: list[str],
+            rows: int,
+            cols: int,
+            tile_width: int = 320,
+            tile_height: int = 180,
+            frequency: int = 15
+    ):
+        '''
+        多路画面拼接流，每个周期只合成、编码一次，所有观看者共享同一份JPEG。
+        :param memory_manager: 取帧的buffer管理器
+        :param core_ids: 参与拼接的core，按行优先依次填入网格
+        :param rows: 网格行数
+        :param cols: 网格列数
+        :param tile_width: 单个格子宽度
+        :param tile_height: 单个格子高度
+        :param frequency: 合成频率，每秒合成多少次
+        '''
+        if rows * cols < len(core_ids):
+            raise ValueError(f"grid {rows}x{cols} is too small for {len(core_ids)} cores")
+
+        self._memory_manager = memory_manager
+        self.core_ids = list(core_ids)
+        self.rows = rows
+        self.cols = cols
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self._interval = 1 / frequency
+
+        # 预分配画布，每个格子是画布上的一个视图，resize结果直接写入视图
+        self._canvas = np.zeros((rows * tile_height, cols * tile_width, 3), dtype=np.uint8)
+        self._tiles: list[np.ndarray] = []
+        for index in range(len(self.core_ids)):
+            row, col = divmod(index, cols)
+            y, x = row * tile_height, col * tile_width
+            self._tiles.append(self._canvas[y:y + tile_height, x:x + tile_width])
+        # 源尺寸与格子尺寸不同时的缩放缓冲
+        self._resized = np.empty((tile_height, tile_width, 3), dtype=np.uint8)
+        # 各core上次合成时的写入计数，没有新帧就跳过
+        self._write_counts: dict[str, int] = {}
+
+        # 最新一次编码结果
+        self._jpeg: bytes | None = None
+        self._seq = 0
+        self._condition = threading.Condition()
+
+        # 观看者计数，归零时停止合成线程
+        self._viewers = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _compose(self) -> bool:
+        '''
+        将各core最新一帧缩放写入画布
+        :return: 画布是否有更新
+        '''
+        updated = False
+        for core_id, tile in zip(self.core_ids, self._tiles):
+            buffer = self._memory_manager.get_buffer(core_id)
+            if buffer is None:
+                continue
+
+            # 只读最新一帧且不移动读指针，避免和单路debug流、其他拼接流抢帧
+            write_count = buffer.get_write_count()
+            if write_count == self._write_counts.get(core_id):
+                continue
+            frame = buffer.read_latest_frame()
+            if frame is None:
+                continue
+            self._write_counts[core_id] = write_count
+
+            image = np.frombuffer(frame.frame_bytes, np.uint8).reshape((frame.video_height, frame.video_width, 3))
+            if image.shape == tile.shape:
+                np.copyto(tile, image)
+            else:
+                cv2.resize(image, (self.tile_width, self.tile_height), dst=self._resized, interpolation=cv2.INTER_AREA)
+                np.copyto(tile, self._resized)
+            updated = True
+        return updated
+
+    def _run(self):
+        while not self._stop.is_set():
+            time.sleep(self._interval)
+            try:
+                if not self._compose() and self._jpeg is not None:
+                    continue
+
+                with profiler.span("encode", "mosaic"):
+                    _, data = cv2.imencode('.jpg', self._canvas)
+                with self._condition:
+                    self._jpeg = data.tobytes()
+                    self._seq += 1
+                    self._condition.notify_all()
+            except Exception as e:
+                logger.error(f"拼接流 {self.core_ids} 错误: {e}")
+
+    def subscribe(self):
+        with self._condition:
+            self._viewers += 1
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self) -> int:
+        '''
+        :return: 剩余观看者数量
+        '''
+        with self._condition:
+            self._viewers = max(self._viewers - 1, 0)
+            viewers = self._viewers
+            thread = self._thread if viewers == 0 else None
+            if thread is not None:
+                self._thread = None
+                self._stop.set()
+                self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        return viewers
+
+    def get_viewer_count(self) -> int:
+        with self._condition:
+            return self._viewers
+
+    def frames(self):
+        '''
+        阻塞迭代新编码出的JPEG，多个观看者拿到的是同一份bytes
+        '''
+        seq = 0
+        while not self._stop.is_set():
+            with self._condition:
+                self._condition.wait_for(lambda: self._seq != seq or self._stop.is_set(), timeout=1)
+                if self._seq == seq:
+                    continue
+                seq, data = self._seq, self._jpeg
+            yield data
@@ -1,17 +1,41 @@
 import threading
 import time
 
+import cv2
+import numpy as np
+
+from core.roi import RegionOfInterest, RegionCrop
 from core.shared_buffer import SharedMemoryManager, Frame
-from utils import get_logger, get_config
+from utils import get_logger, get_config, get_profiler
 
 logger = get_logger(__name__)
 config = get_config()
+profiler = get_profiler()
 
 
 class SampledFrame:
-    def __init__(self, core_id: str, frame: Frame):
+    def __init__(self, core_id: str, frame: Frame, roi: RegionOfInterest | None = None):
+        # 按帧实际尺寸取裁剪框，降分辨率时使用预计算的缩小版本
+        crops = roi.get_crops(frame.video_width, frame.video_height) if roi is not None else None
+        if crops is None:
+            roi = None
+
         self.core_id = core_id
         self.frame = frame
+        self.roi = roi
+
+        # 整帧视图，以及每个感兴趣区域的裁剪框（视图不拷贝数据）
+        self.image = np.frombuffer(frame.frame_bytes, np.uint8).reshape((frame.video_height, frame.video_width, 3))
+        self.crops = crops or [RegionCrop((0, 0, frame.video_width, frame.video_height), None)]
+
+
+class BatchItem:
+    def __init__(self, sampled_frame: SampledFrame, crop: RegionCrop):
+        self.sampled_frame = sampled_frame
+        self.box = crop.box
+        self.mask = crop.mask
+        # 裁剪框内的视图，直接引用帧数据
+        self.image = crop.view(sampled_frame.image)
 
 
 class Processor:
@@ -30,41 +54,122 @@ class Processor:
         self._frame_memory_manager = frame_memory_manager
         self._display_memory_manager = display_memory_manager
 
-        # 采样的帧
+        # 采样的帧，以及按区域展开后的处理批次
         self._sampled_frames: list[SampledFrame] = []
+        self._batch: list[BatchItem] = []
+
+        # 各core的感兴趣区域，配置变更时整体替换
+        self._rois: dict[str, RegionOfInterest] = {}
+        self._roi_lock = threading.Lock()
+
+        # 暂停分析的core
+        self._paused: set[str] = set()
 
         # 执行间隔
         self._process_interval = 1 / process_frequency
 
+        # 执行轮数，以及耗时超过执行间隔的轮数
+        self.tick_count = 0
+        self.deadline_miss_count = 0
+
         # 执行线程
         self._thread = None
         self._stop = threading.Event()
 
     def _process(self):
-        for sampled_frame in self._sampled_frames:
-            if config.debug:
-                self._display_memory_manager.get_buffer(sampled_frame.core_id).write_frame(sampled_frame.frame)
+        # 只在裁剪区域上处理，计算量与区域面积成正比
+        displays: dict[str, np.ndarray] = {}
+        for item in self._batch:
+            sampled_frame = item.sampled_frame
+            with profiler.span("process", sampled_frame.core_id, sampled_frame.frame.seq):
+                if config.debug:
+                    self._draw_region(displays, item)
             # time.sleep(self._process_interval)
 
+        if config.debug:
+            for sampled_frame in self._sampled_frames:
+                frame = sampled_frame.frame
+                if (display := displays.get(sampled_frame.core_id)) is not None:
+                    frame = Frame(display.tobytes(), frame.video_width, frame.video_height, frame.timestamp, frame.seq)
+                self._display_memory_manager.get_buffer(sampled_frame.core_id).write_frame(frame)
+
+    @staticmethod
+    def _draw_region(displays: dict[str, np.ndarray], item: BatchItem):
+        '''
+        debug: 区域外变暗，区域内保留原画面并描出裁剪框
+        '''
+        sampled_frame = item.sampled_frame
+        if sampled_frame.roi is None:
+            return
+
+        display = displays.get(sampled_frame.core_id)
+        if display is None:
+            display = displays[sampled_frame.core_id] = sampled_frame.image // 4
+        x0, y0, x1, y1 = item.box
+        view = display[y0:y1, x0:x1]
+        if item.mask is None:
+            np.copyto(view, item.image)
+        else:
+            np.copyto(view, item.image, where=item.mask[..., None])
+        cv2.rectangle(display, (x0, y0), (x1 - 1, y1 - 1), (0, 255, 0), 1)
+
     def _sample(self):
         self._sampled_frames.clear()
+        self._batch.clear()
+        with self._roi_lock:
+            rois = self._rois
         for core_id, buffer in self._frame_memory_manager.get_all_buffers().items():
-            # logger.info(buffer.get_frame_count())
-            frame = buffer.read_frame()
-            if frame is None:
+            if core_id in self._paused:
                 continue
-            self._sampled_frames.append(SampledFrame(core_id, frame))
+            # logger.info(buffer.get_frame_count())
+            with profiler.span("sample", core_id) as span:
+                frame = buffer.read_frame()
+                if frame is None:
+                    continue
+                span.seq = frame.seq
+                sampled_frame = SampledFrame(core_id, frame, rois.get(core_id))
+                self._sampled_frames.append(sampled_frame)
+                self._batch.extend(BatchItem(sampled_frame, crop) for crop in sampled_frame.crops)
 
             # time.sleep(self._sample_interval)
 
     def _run(self):
         while not self._stop.is_set():
             time.sleep(self._process_interval)
+            start = time.perf_counter()
             try:
                 self._sample()
                 self._process()
             except Exception as e:
                 time.sleep(self._process_interval)
+            self.tick_count += 1
+            if time.perf_counter() - start > self._process_interval:
+                self.deadline_miss_count += 1
+
+    def set_roi(self, core_id: str, roi: RegionOfInterest | None):
+        '''
+        设置感兴趣区域，None 表示处理整帧
+        '''
+        with self._roi_lock:
+            rois = dict(self._rois)
+            if roi is None:
+                rois.pop(core_id, None)
+            else:
+                rois[core_id] = roi
+            self._rois = rois
+
+    def get_roi(self, core_id: str) -> RegionOfInterest | None:
+        with self._roi_lock:
+            return self._rois.get(core_id)
+
+    def set_paused(self, core_id: str, paused: bool):
+        '''
+        暂停/恢复对指定core的分析
+        '''
+        if paused:
+            self._paused = self._paused | {core_id}
+        else:
+            self._paused = self._paused - {core_id}
 
     def start(self):
         self._stop.clear()
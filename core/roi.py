@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# 区域坐标绝对值上限，远大于任何实际分辨率
+_MAX_COORDINATE = 1 << 20
+
+
+@dataclass
+class RegionCrop:
+    box: tuple[int, int, int, int]  # 裁剪框 [x0, x1) x [y0, y1)
+    mask: np.ndarray | None  # 裁剪框内的区域掩码，None 表示裁剪框内全部有效
+
+    def view(self, image: np.ndarray) -> np.ndarray:
+        '''
+        返回裁剪框内的视图，不拷贝数据
+        '''
+        x0, y0, x1, y1 = self.box
+        return image[y0:y1, x0:x1]
+
+    def get_area(self) -> int:
+        x0, y0, x1, y1 = self.box
+        return (x1 - x0) * (y1 - y0)
+
+
+class RegionOfInterest:
+    def __init__(self, regions: list[dict], video_width: int, video_height: int, scales: tuple[int, ...] = ()):
+        '''
+        感兴趣区域，构造时一次性预计算裁剪框和掩码，之后每帧只做切片。
+        每个区域单独裁剪，只有裁剪框相互重叠的区域才合并为一个裁剪框。
+        :param regions: 区域列表，支持两种格式（坐标均为像素）：
+            {"type": "rect", "x": 0, "y": 0, "width": 100, "height": 100}
+            {"type": "polygon", "points": [[x, y], [x, y], ...]}
+        :param video_width: 帧宽
+        :param video_height: 帧高
+        :param scales: 额外预计算的缩小倍数，对应降分辨率后的帧
+        '''
+        if not regions:
+            raise ValueError("regions is empty")
+
+        self.regions = regions
+        self.video_width = video_width
+        self.video_height = video_height
+
+        polygons = [self._to_polygon(region) for region in regions]
+        is_rect = [region.get("type") == "rect" for region in regions]
+        self.crops = self._build_crops(polygons, is_rect, video_width, video_height)
+
+        # 按帧尺寸索引的裁剪结果
+        self._crops_by_size: dict[tuple[int, int], list[RegionCrop]] = {(video_width, video_height): self.crops}
+        for scale in scales:
+            if scale <= 1:
+                continue
+            size = (video_width // scale, video_height // scale)
+            self._crops_by_size[size] = self._build_crops(
+                    [polygon // scale for polygon in polygons], is_rect, *size
+            )
+
+    def _build_crops(
+            self,
+            polygons: list[np.ndarray],
+            is_rect: list[bool],
+            video_width: int,
+            video_height: int
+    ) -> list[RegionCrop]:
+        boxes = [self._to_box(polygon, video_width, video_height) for polygon in polygons]
+
+        # 合并裁剪框重叠的区域，直到所有分组两两不重叠
+        groups = [[i] for i in range(len(polygons))]
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(groups)):
+                for j in range(i + 1, len(groups)):
+                    if self._overlaps(boxes[i], boxes[j]):
+                        groups[i] += groups.pop(j)
+                        boxes[i] = self._union(boxes[i], boxes.pop(j))
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        crops = []
+        for group, box in zip(groups, boxes):
+            # 单个矩形的裁剪框即区域本身，无需掩码
+            mask = None
+            if len(group) > 1 or not is_rect[group[0]]:
+                x0, y0, x1, y1 = box
+                mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+                cv2.fillPoly(mask, [(polygons[i] - (x0, y0)).astype(np.int32) for i in group], 1)
+                mask = mask.astype(bool)
+            crops.append(RegionCrop(box, mask))
+        return crops
+
+    def get_crops(self, video_width: int, video_height: int) -> list[RegionCrop] | None:
+        '''
+        获取指定帧尺寸下的裁剪框，未预计算的尺寸返回 None
+        '''
+        return self._crops_by_size.get((video_width, video_height))
+
+    @staticmethod
+    def _to_polygon(region: dict) -> np.ndarray:
+        region_type = region.get("type")
+        if region_type == "rect":
+            x, y = float(region["x"]) // 1, float(region["y"]) // 1
+            w, h = float(region["width"]) // 1, float(region["height"]) // 1
+            if not w > 0 or not h > 0:
+                raise ValueError(f"invalid rect: {region}")
+            points = np.array([[x, y], [x + w - 1, y], [x + w - 1, y + h - 1], [x, y + h - 1]], dtype=np.float64)
+        elif region_type == "polygon":
+            points = np.array(region["points"], dtype=np.float64)
+            if points.ndim != 2 or points.shape[0] < 3 or points.shape[1] != 2:
+                raise ValueError(f"invalid polygon: {region}")
+        else:
+            raise ValueError(f"unknown region type: {region_type}")
+
+        # 坐标先在宽类型中校验范围，避免转换 int32 时溢出
+        if not np.isfinite(points).all() or np.abs(points).max() > _MAX_COORDINATE:
+            raise ValueError(f"region coordinates out of range: {region}")
+        return points.astype(np.int32)
+
+    @staticmethod
+    def _to_box(polygon: np.ndarray, video_width: int, video_height: int) -> tuple[int, int, int, int]:
+        x0, y0 = np.clip(polygon.min(axis=0), 0, (video_width, video_height))
+        x1, y1 = np.clip(polygon.max(axis=0) + 1, 0, (video_width, video_height))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("region is outside of the frame")
+        return int(x0), int(y0), int(x1), int(y1)
+
+    @staticmethod
+    def _overlaps(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> bool:
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+    @staticmethod
+    def _union(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+        return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+    def get_area(self) -> int:
+        return sum(crop.get_area() for crop in self.crops)
+
+    def to_dict(self) -> dict:
+        return {
+            "regions": self.regions,
+            "boxes": [list(crop.box) for crop in self.crops],
+            "masked": [crop.mask is not None for crop in self.crops],
+            "area": self.get_area(),
+        }
@@ -1,3 +1,4 @@
+from bisect import bisect_left, insort
 from multiprocessing.shared_memory import SharedMemory
 from multiprocessing import Lock
 
@@ -5,11 +6,13 @@ import numpy as np
 
 
 class Frame:
-    def __init__(self, frame_bytes: bytes, video_width: int, video_height: int, timestamp: int):
+    def __init__(self, frame_bytes: bytes, video_width: int, video_height: int, timestamp: int, seq: int = 0):
         self.frame_bytes = frame_bytes
         self.video_width = video_width
         self.video_height = video_height
         self.timestamp = timestamp
+        # 帧序号，仅用于性能分析时串联各阶段，不参与编解码
+        self.seq = seq
 
     def __len__(self):
         return len(self.frame_bytes) + 8
@@ -45,33 +48,135 @@ class SharedRingBuffer:
         self.write_pos = 0
         self.lock = Lock()
 
+        # 时间戳索引：按时间戳升序排列的 (timestamp, slot)，只覆盖已写入的槽位
+        self.slot_timestamps: list[int | None] = [None] * num_slots
+        self.timestamp_index: list[tuple[int, int]] = []
+
+        # 每个槽位实际存放的帧尺寸，降分辨率时帧可能小于槽位容量
+        self.slot_sizes: list[tuple[int, int]] = [(video_width, video_height)] * num_slots
+        self.slot_seqs: list[int] = [0] * num_slots
+
+        # 累计写入帧数，以及未被读取就被覆盖的帧数
+        self.write_count = 0
+        self.overwrite_count = 0
+
+    def _index_slot(self, slot: int, timestamp: int) -> None:
+        old_timestamp = self.slot_timestamps[slot]
+        if old_timestamp is not None:
+            del self.timestamp_index[bisect_left(self.timestamp_index, (old_timestamp, slot))]
+        self.slot_timestamps[slot] = timestamp
+        insort(self.timestamp_index, (timestamp, slot))
+
+    def _find_closest(self, timestamp: int) -> tuple[int, int] | None:
+        '''
+        二分查找时间戳最接近的槽位
+        :return: (timestamp, slot)
+        '''
+        if not self.timestamp_index:
+            return None
+        i = bisect_left(self.timestamp_index, (timestamp, -1))
+        if i == 0:
+            return self.timestamp_index[0]
+        if i == len(self.timestamp_index):
+            return self.timestamp_index[-1]
+        before, after = self.timestamp_index[i - 1], self.timestamp_index[i]
+        return before if timestamp - before[0] <= after[0] - timestamp else after
+
+    def _read_slot(self, slot: int) -> Frame:
+        video_width, video_height = self.slot_sizes[slot]
+        data = self.buffer[slot, :video_width * video_height * 3 + 8].tobytes()
+        frame = Frame.from_bytes(data, video_width, video_height)
+        frame.seq = self.slot_seqs[slot]
+        return frame
+
     def write_frame(self, frame: Frame) -> None:
+        data = frame.to_bytes()
+        if len(data) > self.frame_size:
+            raise ValueError(f"frame {frame.video_width}x{frame.video_height} exceeds slot size")
+
         with self.lock:
-            self.buffer[self.write_pos] = np.frombuffer(frame.to_bytes(), dtype=np.uint8)
+            self.buffer[self.write_pos, :len(data)] = np.frombuffer(data, dtype=np.uint8)
+            self.slot_sizes[self.write_pos] = (frame.video_width, frame.video_height)
+            self.slot_seqs[self.write_pos] = frame.seq
+            self._index_slot(self.write_pos, frame.timestamp)
             self.write_pos = (self.write_pos + 1) % self.num_slots
+            self.write_count += 1
 
             # 如果写指针追上读指针，则读指针后移一位
             if self.read_pos == self.write_pos:
                 self.read_pos = (self.read_pos + 1) % self.num_slots
+                self.overwrite_count += 1
 
     def read_frame(self) -> Frame | None:
         with self.lock:
             if self.read_pos == self.write_pos:
                 return None
 
-            frame = Frame.from_bytes(self.buffer[self.read_pos].tobytes(), self.video_width, self.video_height)
+            frame = self._read_slot(self.read_pos)
             self.read_pos = (self.read_pos + 1) % self.num_slots
             return frame
 
+    def read_latest_frame(self) -> Frame | None:
+        '''
+        读取最新写入的一帧，不移动读指针，不影响其他读取方
+        '''
+        with self.lock:
+            if self.write_count == 0:
+                return None
+            return self._read_slot((self.write_pos - 1) % self.num_slots)
+
+    def find_timestamp(self, timestamp: int) -> int | None:
+        '''
+        查找缓冲区中与 timestamp 最接近的帧时间戳，不拷贝帧数据
+        '''
+        with self.lock:
+            closest = self._find_closest(timestamp)
+            return closest[0] if closest is not None else None
+
+    def read_frame_at(self, timestamp: int, tolerance: int | None = None) -> Frame | None:
+        '''
+        读取时间戳最接近 timestamp 的帧，不移动读指针
+        :param timestamp: 目标时间戳（毫秒）
+        :param tolerance: 允许的最大误差（毫秒），None 表示不限制
+        '''
+        with self.lock:
+            closest = self._find_closest(timestamp)
+            if closest is None:
+                return None
+            found_timestamp, slot = closest
+            if tolerance is not None and abs(found_timestamp - timestamp) > tolerance:
+                return None
+            return self._read_slot(slot)
+
+    def get_time_range(self) -> tuple[int, int] | None:
+        '''
+        缓冲区内最早、最晚的帧时间戳
+        '''
+        with self.lock:
+            if not self.timestamp_index:
+                return None
+            return self.timestamp_index[0][0], self.timestamp_index[-1][0]
+
     def clear(self):
         with self.lock:
             self.read_pos = 0
             self.write_pos = 0
+            self.slot_timestamps = [None] * self.num_slots
+            self.timestamp_index.clear()
+            self.write_count = 0
 
     def get_frame_count(self) -> int:
         with self.lock:
             return (self.write_pos - self.read_pos + self.num_slots) % self.num_slots
 
+    def get_write_count(self) -> int:
+        with self.lock:
+            return self.write_count
+
+    def get_overwrite_count(self) -> int:
+        with self.lock:
+            return self.overwrite_count
+
     def close(self):
         with self.lock:
             self.shm.close()
@@ -92,6 +197,44 @@ class SharedMemoryManager:
     def get_all_buffers(self) -> dict[str, SharedRingBuffer]:
         return self.buffers
 
+    def read_aligned_frames(
+            self,
+            core_ids: list[str],
+            timestamp: int | None = None,
+            tolerance: int = 40
+    ) -> dict[str, Frame] | None:
+        '''
+        读取一组core在同一时刻的帧
+        :param core_ids: core列表
+        :param timestamp: 目标时间戳（毫秒），None 表示所有core都已到达的最新时刻
+        :param tolerance: 每路帧与目标时间戳允许的最大误差（毫秒）
+        :return: core_id -> Frame，任意一路无法对齐时返回 None
+        '''
+        buffers = [self.buffers.get(core_id) for core_id in core_ids]
+        if not buffers or any(buffer is None for buffer in buffers):
+            return None
+
+        if timestamp is None:
+            time_ranges = [buffer.get_time_range() for buffer in buffers]
+            if any(time_range is None for time_range in time_ranges):
+                return None
+            timestamp = min(time_range[1] for time_range in time_ranges)
+
+        # 先只在索引上确认每一路都能对齐，再拷贝帧数据
+        for buffer in buffers:
+            found = buffer.find_timestamp(timestamp)
+            if found is None or abs(found - timestamp) > tolerance:
+                return None
+
+        frames = {}
+        for core_id, buffer in zip(core_ids, buffers):
+            frame = buffer.read_frame_at(timestamp, tolerance)
+            if frame is None:
+                # 查找与读取之间槽位被覆盖
+                return None
+            frames[core_id] = frame
+        return frames
+
     def remove_buffer(self, core_id: str):
         temp_buffer = self.buffers.pop(core_id, None)
         if temp_buffer:
@@ -1,7 +1,11 @@
+import threading
 from uuid import uuid4
 
 from core.shared_buffer import SharedMemoryManager
 from core.processor import Processor
+from core.governor import Governor, GovernorTransition
+from core.mosaic import MosaicStream
+from core.roi import RegionOfInterest
 from utils import get_config, get_logger
 from core.stream_core import StreamCore, StreamCoreConfig, StreamCoreStatus
 
@@ -24,6 +28,14 @@ class StreamController:
         )
         self.processor.start()
 
+        # 负载过高时逐级降级
+        self.governor = Governor(self.cores, self.frame_memory_manager, self.processor)
+        self.governor.start()
+
+        # debug 拼接流，相同布局的观看者共享同一个实例
+        self.mosaics: dict[tuple, MosaicStream] = {}
+        self.mosaic_lock = threading.Lock()
+
     def create_core(
             self,
             username: str,
@@ -102,11 +114,83 @@ class StreamController:
         if core := self.cores.get(core_id):
             core.stop()
             del self.cores[core_id]
+            self.processor.set_roi(core_id, None)
+            self.processor.set_paused(core_id, False)
             self.frame_memory_manager.remove_buffer(core_id)
             self.display_memory_manager.remove_buffer(core_id)
             return True
         return False
 
+    def set_core_roi(self, core_id: str, regions: list[dict] | None) -> bool:
+        """
+        设置实例的感兴趣区域，regions 为空时恢复整帧处理
+        """
+        if core := self.cores.get(core_id):
+            roi = None
+            if regions:
+                # 同时预计算降分辨率后的裁剪框
+                roi = RegionOfInterest(
+                        regions,
+                        core.video_width,
+                        core.video_height,
+                        scales=(self.config.degrade_resolution_scale,)
+                )
+            self.processor.set_roi(core_id, roi)
+            return True
+        return False
+
+    def get_core_roi(self, core_id: str) -> dict | None:
+        """
+        获取实例的感兴趣区域
+        """
+        if roi := self.processor.get_roi(core_id):
+            return roi.to_dict()
+        return None
+
+    def get_governor_transitions(self) -> list[GovernorTransition]:
+        """
+        获取降级调节记录
+        """
+        return self.governor.get_transitions()
+
+    def acquire_mosaic(
+            self,
+            core_ids: list[str],
+            rows: int,
+            cols: int,
+            tile_width: int = 320,
+            tile_height: int = 180
+    ) -> MosaicStream:
+        """
+        获取拼接流并登记一个观看者，相同参数复用同一实例
+        """
+        key = (tuple(core_ids), rows, cols, tile_width, tile_height)
+        with self.mosaic_lock:
+            mosaic = self.mosaics.get(key)
+            if mosaic is None:
+                mosaic = MosaicStream(
+                        self.display_memory_manager,
+                        core_ids,
+                        rows,
+                        cols,
+                        tile_width=tile_width,
+                        tile_height=tile_height,
+                        frequency=self.config.mosaic_frequency
+                )
+                self.mosaics[key] = mosaic
+            mosaic.subscribe()
+            return mosaic
+
+    def release_mosaic(self, mosaic: MosaicStream) -> None:
+        """
+        注销一个观看者，没有观看者时销毁拼接流
+        """
+        with self.mosaic_lock:
+            if mosaic.unsubscribe() == 0:
+                for key, value in list(self.mosaics.items()):
+                    if value is mosaic:
+                        del self.mosaics[key]
+
     # def enable_ai(self, core_id: str, enable_ai: bool) -> bool:
     #     """
     #     启停AI
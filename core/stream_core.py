@@ -1,15 +1,19 @@
 import threading
+import time
 import av
 
+from collections import deque
 from datetime import datetime
 from av.container import InputContainer
 from onvif import ONVIFCamera
 from dataclasses import dataclass
 
 from core.shared_buffer import SharedRingBuffer, Frame
-from utils import get_logger
+from utils import get_logger, get_config, get_profiler
 
 logger = get_logger(__name__)
+config = get_config()
+profiler = get_profiler()
 
 
 # @dataclass
@@ -46,6 +50,11 @@ class StreamCoreStatus:
 
     is_running: bool
 
+    # 降级状态
+    decode_lag: int
+    degrade_level: int
+    degrade_stages: list[str]
+
 
 class StreamCore:
     def __init__(self, config: StreamCoreConfig):
@@ -72,6 +81,15 @@ class StreamCore:
         self.bytes_per_pixel = config.bytes_per_pixel
         self.frame_size = self.video_width * self.video_height * self.bytes_per_pixel
 
+        # 已解码帧的序号，用于性能分析串联各阶段
+        self.frame_seq = 0
+
+        # 解码延迟（毫秒）：墙钟流逝时间与视频pts流逝时间之差
+        self.decode_lag = 0
+
+        # 当前生效的降级阶段，由调节器设置
+        self.degrade_stages: list[str] = []
+
         logger.info(f"处理核心 {self.core_id} 创建完成")
 
     def _sync_device_time(self) -> None:
@@ -106,28 +124,91 @@ class StreamCore:
             stream = next(s for s in self.container.streams if s.type == "video")
 
             sync = False
-            for video_frame in self.container.decode(stream):
-                if self.stop_event.is_set():
+            skip_frame = "DEFAULT"
+            # 最近 DECODE_LAG_WINDOW 秒内每帧的 (单调时钟, pts时间)，用于计算滑动窗口内的延迟增长
+            lag_samples: deque[tuple[int, int]] = deque()
+            frame_count = 0
+            # 流中是否出现过B帧，出现过则 fps 阶段靠解码器跳过B帧即可降低帧率
+            has_b_frames = False
+            packets = self.container.demux(stream)
+            while not self.stop_event.is_set():
+                # 拆开解复用和解码，便于分别统计耗时；span 的 seq 为即将产出的帧序号
+                with profiler.span("demux", self.core_id, self.frame_seq + 1):
+                    packet = next(packets, None)
+                if packet is None:
                     break
-
-                if not video_frame.pts:
-                    continue
-
-                if not sync:
-                    sync = True
-                    self._sync_device_time()
-
-                image = video_frame.to_ndarray(format="bgr24")
-                absolute_time = self.device_time + int(video_frame.pts * video_frame.time_base * 1000)
-                frame = Frame(image.tobytes(), self.video_width, self.video_height, absolute_time)
-                self.frame_buffer.write_frame(frame)
+                with profiler.span("decode", self.core_id, self.frame_seq + 1):
+                    video_frames = packet.decode()
+
+                for video_frame in video_frames:
+                    if not video_frame.pts:
+                        continue
+                    self.frame_seq += 1
+
+                    pts_time = int(video_frame.pts * video_frame.time_base * 1000)
+                    if not sync:
+                        sync = True
+                        self._sync_device_time()
+                    self._update_decode_lag(lag_samples, pts_time)
+
+                    if video_frame.pict_type.name == "B":
+                        has_b_frames = True
+
+                    # 降级：解码器上 fps 跳过非参考帧、keyframe 只解关键帧；
+                    # 无B帧的流没有非参考帧可跳，fps 阶段改为按步长丢弃转换前的帧
+                    stages = self.degrade_stages
+                    if "keyframe" in stages:
+                        target_skip_frame = "NONKEY"
+                    elif "fps" in stages:
+                        target_skip_frame = "NONREF"
+                    else:
+                        target_skip_frame = "DEFAULT"
+                    if target_skip_frame != skip_frame:
+                        skip_frame = target_skip_frame
+                        stream.codec_context.skip_frame = skip_frame
+
+                    if "fps" in stages and "keyframe" not in stages and not has_b_frames:
+                        frame_count += 1
+                        if frame_count % config.degrade_frame_stride != 0:
+                            continue
+
+                    video_width, video_height = self.video_width, self.video_height
+                    if "resolution" in stages:
+                        video_width //= config.degrade_resolution_scale
+                        video_height //= config.degrade_resolution_scale
+
+                    with profiler.span("convert", self.core_id, self.frame_seq):
+                        image = video_frame.to_ndarray(width=video_width, height=video_height, format="bgr24")
+                    absolute_time = self.device_time + pts_time
+                    frame = Frame(image.tobytes(), video_width, video_height, absolute_time, self.frame_seq)
+                    with profiler.span("ring_write", self.core_id, self.frame_seq):
+                        self.frame_buffer.write_frame(frame)
 
         except Exception as e:
             logger.error(f"核心 {self.core_id} 错误: {e}")
         finally:
             self.container = None
+            self.decode_lag = 0
             logger.info(f"核心 {self.core_id} 推流源: {self.ip} 停止")
 
+    def _update_decode_lag(self, lag_samples: deque[tuple[int, int]], pts_time: int):
+        '''
+        解码延迟 = 窗口内墙钟流逝时间 - 窗口内pts流逝时间。
+        只看最近一个窗口，时钟漂移和跳变不会长期累积。
+        '''
+        now = int(time.monotonic() * 1000)
+        window = config.decode_lag_window * 1000
+        if lag_samples and pts_time < lag_samples[-1][1]:
+            # pts 回绕或重置，重新建立基准
+            lag_samples.clear()
+        lag_samples.append((now, pts_time))
+        # 保留窗口边界外的最后一个样本，解码卡顿超过窗口时也能体现出来
+        while len(lag_samples) > 1 and now - lag_samples[1][0] >= window:
+            lag_samples.popleft()
+
+        start_wall_time, start_pts_time = lag_samples[0]
+        self.decode_lag = max((now - start_wall_time) - (pts_time - start_pts_time), 0)
+
     def start(self):
         '''
         启动：该函数是提供给主线程使用的
@@ -151,6 +232,12 @@ class StreamCore:
             except Exception as e:
                 logger.error(f"关闭推流源 {self.ip} 错误: {e}")
 
+    def set_degrade_stages(self, stages: list[str]):
+        '''
+        设置降级阶段，解码线程在下一帧生效
+        '''
+        self.degrade_stages = list(stages)
+
     def get_status(self) -> StreamCoreStatus:
         return StreamCoreStatus(
                 core_id=self.core_id,
@@ -159,4 +246,7 @@ class StreamCore:
                 video_height=self.video_height,
                 bytes_per_pixel=self.bytes_per_pixel,
                 is_running=self.thread and self.thread.is_alive(),
+                decode_lag=self.decode_lag,
+                degrade_level=len(self.degrade_stages),
+                degrade_stages=self.degrade_stages,
         )
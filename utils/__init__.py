@@ -1,8 +1,14 @@
 from utils.config import Config
 from utils.logger import get_logger
+from utils.profiler import Profiler
 
 config = Config()
+profiler = Profiler()
 
 
 def get_config() -> Config:
     return Config()
+
+
+def get_profiler() -> Profiler:
+    return profiler
@@ -13,6 +13,19 @@ class Config:
         self.stream_server_url = os.getenv("STREAM_SERVER_URL")
 
         self.process_frequency = int(os.getenv("PROCESS_FREQUENCY", 30))
+        self.mosaic_frequency = int(os.getenv("MOSAIC_FREQUENCY", 15))
+
+        # 降级调节器
+        self.governor_interval = float(os.getenv("GOVERNOR_INTERVAL", 2))
+        self.governor_ladder = [stage.strip() for stage in os.getenv("GOVERNOR_LADDER", "fps,keyframe,resolution,pause").split(",") if stage.strip()]
+        self.governor_max_decode_lag = int(os.getenv("GOVERNOR_MAX_DECODE_LAG", 1000))
+        self.governor_max_overwrites = int(os.getenv("GOVERNOR_MAX_OVERWRITES", 10))
+        self.governor_max_miss_ratio = float(os.getenv("GOVERNOR_MAX_MISS_RATIO", 0.3))
+        self.governor_recover_intervals = int(os.getenv("GOVERNOR_RECOVER_INTERVALS", 5))
+        self.governor_cooldown_intervals = int(os.getenv("GOVERNOR_COOLDOWN_INTERVALS", 3))
+        self.decode_lag_window = float(os.getenv("DECODE_LAG_WINDOW", 10))
+        self.degrade_frame_stride = int(os.getenv("DEGRADE_FRAME_STRIDE", 2))
+        self.degrade_resolution_scale = int(os.getenv("DEGRADE_RESOLUTION_SCALE", 2))
 
         self._check()
 
@@ -21,3 +34,6 @@ class Config:
             raise ValueError("FFMPEG_EXECUTABLE is not set")
         if self.stream_server_url is None:
             raise ValueError("STREAM_SERVER_URL is not set")
+        for stage in self.governor_ladder:
+            if stage not in ("fps", "keyframe", "resolution", "pause"):
+                raise ValueError(f"GOVERNOR_LADDER has unknown stage: {stage}")
@@ -0,0 +1,174 @@
+import os
+import sys
+import threading
+import time
+from collections import deque, Counter
+
+
+class _NullSpan:
+    # 共享的单例，忽略对 seq 的写入，避免未开启分析时修改全局状态
+    @property
+    def seq(self):
+        return None
+
+    @seq.setter
+    def seq(self, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class _Span:
+    def __init__(self, spans: deque, name: str, core_id: str | None, seq: int | None):
+        self._spans = spans
+        self._name = name
+        self._core_id = core_id
+        # 帧序号，可在 with 块内补充
+        self.seq = seq
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        self._spans.append((self._name, threading.get_ident(), self._start, end - self._start, self._core_id, self.seq))
+        return False
+
+
+class Profiler:
+    def __init__(self, max_spans: int = 200000):
+        '''
+        按需开启的性能分析器：全线程栈采样 + 每帧各阶段耗时记录。
+        未开启时 span() 返回空上下文，几乎没有开销。
+        :param max_spans: 最多保留的阶段记录数，超出后丢弃最旧的
+        '''
+        self._spans: deque = deque(maxlen=max_spans)
+        self._stacks: Counter = Counter()
+        self._sample_count = 0
+        self._interval = 0.01
+        self._started_at = 0
+        self._stopped_at = 0
+
+        self.enabled = False
+
+        # 采样线程
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def span(self, name: str, core_id: str | None = None, seq: int | None = None):
+        '''
+        记录一个阶段的耗时，用法: with profiler.span("decode", core_id, seq): ...
+        '''
+        if not self.enabled:
+            return _null_span
+        return _Span(self._spans, name, core_id, seq)
+
+    @staticmethod
+    def _collapse(frame) -> list[str]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self._interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = [names.get(ident, str(ident))] + self._collapse(frame)
+                self._stacks[";".join(stack)] += 1
+            self._sample_count += 1
+
+    def start(self, interval: float = 0.01) -> bool:
+        '''
+        开始采样，会清空上一次的结果
+        :param interval: 栈采样间隔（秒）
+        '''
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._spans.clear()
+            self._stacks.clear()
+            self._sample_count = 0
+            self._interval = interval
+            self._started_at = time.perf_counter_ns()
+            self._stopped_at = 0
+
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._thread.start()
+            self.enabled = True
+            return True
+
+    def stop(self) -> bool:
+        with self._lock:
+            if self._thread is None:
+                return False
+            self.enabled = False
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._stopped_at = time.perf_counter_ns()
+            return True
+
+    def export_collapsed(self) -> str:
+        '''
+        导出折叠栈格式，可直接交给 flamegraph.pl / speedscope
+        '''
+        return "\n".join(f"{stack} {count}" for stack, count in list(self._stacks.items()))
+
+    def export_chrome_trace(self) -> dict:
+        '''
+        导出 Chrome trace 格式，可在 chrome://tracing 或 Perfetto 中打开
+        '''
+        pid = os.getpid()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        events = []
+        thread_ids = set()
+        for name, ident, start, duration, core_id, seq in list(self._spans):
+            thread_ids.add(ident)
+            events.append({
+                "name": name,
+                "cat": "stage",
+                "ph": "X",
+                "ts": (start - self._started_at) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": ident,
+                "args": {"core_id": core_id, "seq": seq},
+            })
+        for ident in thread_ids:
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": ident,
+                "args": {"name": names.get(ident, str(ident))},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def get_status(self) -> dict:
+        end = self._stopped_at or time.perf_counter_ns()
+        return {
+            "running": self.enabled,
+            "interval": self._interval,
+            "duration": (end - self._started_at) / 1e9 if self._started_at else 0,
+            "sample_count": self._sample_count,
+            "stack_count": len(self._stacks),
+            "span_count": len(self._spans),
+        }